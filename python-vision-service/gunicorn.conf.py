@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration for the Blueprint Vision Service
+Usage: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import multiprocessing
+import os
+
+bind = "0.0.0.0:5001"
+
+# Room detection is CPU-bound, but OpenCV releases the GIL inside its C++ calls,
+# so one process per core plus a few threads each saturates the machine
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = 4
+
+# Import the app (OpenCV, numpy, numba, tesseract bindings) once in the master and
+# fork workers from it, so the modules are loaded once and pages shared copy-on-write.
+# Anything per-worker (OpenCL probe, tesseract engines) is created lazily after the fork
+preload_app = True
+
+# Large blueprints (download + detection + OCR) can take a while
+timeout = 120